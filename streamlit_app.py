@@ -2,14 +2,31 @@ import streamlit as st
 import os
 import json
 import time
+import hashlib
+import io
+import operator
+import threading
 from datetime import datetime
+from pathlib import Path
 import concurrent.futures
+from collections import defaultdict
 from typing import List, Dict, Any
 import re
 import zipfile
+import tarfile
 import shutil
 import asyncio
 
+try:
+    import orjson
+except ImportError:  # Optional - story data falls back to the stdlib json encoder
+    orjson = None
+
+try:
+    import zstandard as zstd
+except ImportError:  # Optional - downloads fall back to the ZIP bundle only
+    zstd = None
+
 # Import local components
 from outline_generation_agent import OutlineGenerator
 from character_development_agent import CharacterDevelopmentAgent
@@ -22,6 +39,13 @@ from text_to_speech_agent import TextToSpeechAgent
 
 # Below the existing imports
 
+# Caps LLM requests in flight across all worker pools, sessions and reruns so parallel
+# steps don't stampede the provider into rate limiting; pools stay wide for I/O overlap.
+# A cached resource, since module globals of the app script are rebuilt on every rerun.
+@st.cache_resource(show_spinner=False)
+def llm_semaphore():
+    return threading.BoundedSemaphore(int(os.getenv("KUKUFM_LLM_CONCURRENCY", "8")))
+
 # Page configuration
 st.set_page_config(
     page_title="KUKUFM Story Generator",
@@ -86,6 +110,24 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Agents are shared across reruns and sessions so their LLM clients (and HTTP
+# connection pools) are built once per process instead of on every step
+_AGENT_FACTORIES = {
+    "outline": OutlineGenerator,
+    "plot": PlotSelectorAgent,
+    "character": CharacterDevelopmentAgent,
+    "splitter": StorySplitterAgent,
+    "enhancer": EpisodeLengtheningAgent,
+    "dialogue": DialogueAgent,
+    "translator": TranslatorAgent,
+    "tts": TextToSpeechAgent,
+}
+
+@st.cache_resource(show_spinner=False)
+def get_agent(name: str):
+    """Return the process-wide instance of the named agent, creating it on first use"""
+    return _AGENT_FACTORIES[name]()
+
 # Function to create story directory
 def create_story_directory(topic):
     """Create a unique directory for this story based on name and timestamp"""
@@ -104,12 +146,34 @@ def create_story_directory(topic):
     
     return story_dir
 
+# Serialize objects json can't handle (e.g. pydantic models) through their attributes
+def _json_default(obj):
+    if hasattr(obj, '__dict__'):
+        return obj.__dict__
+    return str(obj)
+
+# Function to write story_data.json
+def write_story_data(story_data, path):
+    """Write story data as indented JSON, using orjson when it is installed"""
+    # Write to a temporary file and rename so an interrupted run never leaves a partial file
+    tmp = path + ".tmp"
+    if orjson is not None:
+        with open(tmp, 'wb') as f:
+            f.write(orjson.dumps(
+                story_data,
+                default=_json_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ))
+    else:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(story_data, f, indent=2, ensure_ascii=False, default=_json_default)
+    os.replace(tmp, path)
+
 # Function to save story data and final files
 def save_story(story_data, story_dir):
     """Save generated story to JSON and text files in the story directory"""
-    # Save complete story data as JSON using custom encoder
-    with open(f"{story_dir}/story_data.json", 'w', encoding='utf-8') as f:
-        json.dump(story_data, f, indent=2, ensure_ascii=False)
+    # Save complete story data as JSON
+    write_story_data(story_data, f"{story_dir}/story_data.json")
         
     # Save readable story text
     with open(f"{story_dir}/story_details.md", 'w', encoding='utf-8') as f:
@@ -155,9 +219,10 @@ def save_story(story_data, story_dir):
             if episode_cliffhanger:
                 f.write(f"**Cliffhanger:** {episode_cliffhanger}\n\n")
     
-    # Save the final story with dialogues
+    # Save the final story with dialogues (written to a temporary file, then renamed)
     filename = f"{story_dir}/final_story.md"
-    with open(filename, 'w', encoding='utf-8') as f:
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
         # Title and intro
         f.write(f"# {story_data['topic']}\n\n")
         
@@ -212,6 +277,7 @@ def save_story(story_data, story_dir):
         
         # Add metadata at the end
         f.write(f"\n\n*Generated on {datetime.now().strftime('%Y-%m-%d')}*\n")
+    os.replace(tmp_filename, filename)
     
     return story_dir
 
@@ -228,7 +294,7 @@ def generate_episode_audio(episode_number):
         return None
         
     # Find the episode
-    episode = next((ep for ep in st.session_state.episodes if ep.number == episode_number), None)
+    episode = st.session_state.episodes_by_num.get(episode_number)
     if not episode:
         st.error(f"Episode {episode_number} not found.")
         return None
@@ -244,7 +310,7 @@ def generate_episode_audio(episode_number):
     
     # Initialize the TTS agent
     try:
-        tts_agent = TextToSpeechAgent()
+        tts_agent = get_agent("tts")
         
         with st.spinner(f"Generating audio for Episode {episode_number}..."):
             # Generate audio
@@ -265,6 +331,27 @@ def generate_episode_audio(episode_number):
         st.error(f"Error generating audio: {str(e)}")
         return None
 
+# Read an audio file once per modification so repeated plays are served from memory
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_audio_bytes(path: str, mtime: float) -> bytes:
+    """Return the raw bytes of an audio file; mtime only serves to invalidate the cache"""
+    return Path(path).read_bytes()
+
+# Callback for the listen buttons - remembers which episode's player to show on this run
+def _play_cb(episode_number):
+    st.session_state.playing_episode = episode_number
+
+# Listen button for a single episode - a fragment, so clicking it reruns only this button
+@st.fragment
+def episode_audio_button(episode_number, label):
+    """Render a button that shows the episode's audio player once clicked"""
+    # One key per episode, shared across steps since only one step renders at a time
+    st.button(label, key=f"play_{episode_number}", on_click=_play_cb, args=(episode_number,))
+    if st.session_state.playing_episode == episode_number:
+        # Consume the click so the player (and any TTS generation) only runs for the click itself
+        st.session_state.playing_episode = None
+        play_episode_audio(episode_number)
+
 # Add this new function to play audio for an episode with streaming support
 def play_episode_audio(episode_number):
     """Play or generate audio for a specific episode if not already generated"""
@@ -278,7 +365,7 @@ def play_episode_audio(episode_number):
         return None
         
     # Find the episode
-    episode = next((ep for ep in st.session_state.episodes if ep.number == episode_number), None)
+    episode = st.session_state.episodes_by_num.get(episode_number)
     if not episode:
         st.error(f"Episode {episode_number} not found.")
         return None
@@ -303,7 +390,7 @@ def play_episode_audio(episode_number):
     with col1:
         # Generate and play from file
         if os.path.exists(audio_path):
-            st.audio(audio_path)
+            st.audio(load_audio_bytes(audio_path, os.path.getmtime(audio_path)), format='audio/mp3')
             st.success("Playing pre-generated audio file")
             return audio_path
         else:
@@ -312,7 +399,7 @@ def play_episode_audio(episode_number):
                 audio_path = generate_episode_audio(episode_number)
             
             if audio_path and os.path.exists(audio_path):
-                st.audio(audio_path)
+                st.audio(load_audio_bytes(audio_path, os.path.getmtime(audio_path)), format='audio/mp3')
                 st.success("Audio generated and playing")
                 return audio_path
     
@@ -327,7 +414,7 @@ def play_episode_audio(episode_number):
             
             try:
                 # Using the streaming function
-                tts_agent = TextToSpeechAgent()
+                tts_agent = get_agent("tts")
                 
                 # Create and run the async function
                 async def stream_episode():
@@ -384,6 +471,16 @@ def init_session_state():
         st.session_state.translated_files = []
     if 'target_languages' not in st.session_state:
         st.session_state.target_languages = []
+    if 'sorted_episode_nums' not in st.session_state:
+        st.session_state.sorted_episode_nums = []
+    if 'episodes_by_num' not in st.session_state:
+        st.session_state.episodes_by_num = {}
+    if 'serialized_episodes' not in st.session_state:
+        st.session_state.serialized_episodes = None
+    if 'serialized_enhanced_episodes' not in st.session_state:
+        st.session_state.serialized_enhanced_episodes = None
+    if 'playing_episode' not in st.session_state:
+        st.session_state.playing_episode = None
 
 # Show step status indicator
 def show_steps():
@@ -411,13 +508,100 @@ def show_steps():
     
     st.divider()
 
+# Cached LLM wrappers - keyed on their inputs so reruns triggered by unrelated
+# widget interactions don't re-invoke the LLM
+@st.cache_data(show_spinner=False)
+def _outline_for(topic: str) -> List[str]:
+    return get_agent("outline").generate_outline(topic)
+
+# The plot and character agents return placeholders instead of raising when the LLM call
+# fails. Raising from inside a cached wrapper keeps those placeholders out of the cache,
+# so retrying with the same input calls the LLM again.
+class _FallbackResult(Exception):
+    def __init__(self, value):
+        super().__init__("agent returned its error fallback")
+        self.value = value
+
+def _uncached_fallback(cached_fn, *args):
+    """Call a cached wrapper, returning the agent's fallback (uncached) if it raised one"""
+    try:
+        return cached_fn(*args)
+    except _FallbackResult as e:
+        return e.value
+
+@st.cache_data(show_spinner=False)
+def _plot_for(outline: List[str]) -> PlotResponse:
+    plot_result = get_agent("plot").generate_plot(outline)
+    if plot_result.detailed_plot.startswith("Error generating plot."):
+        raise _FallbackResult(plot_result)
+    return plot_result
+
+@st.cache_data(show_spinner=False)
+def _characters_for(plot: str) -> List[Dict[str, Any]]:
+    characters = get_agent("character").generate_characters(plot)
+    if [character.get("name") for character in characters] == ["Character 1", "Character 2", "Character 3"]:
+        raise _FallbackResult(characters)
+    return characters
+
+# Disk-persisted wrappers for the per-episode LLM steps - keyed on the episode inputs so
+# repeated clicks or reruns of steps 5-6 are served from the cache. Agents are passed as
+# underscore arguments, which Streamlit excludes from the cache key. Persistent caches
+# don't support ttl, so none is set.
+@st.cache_data(show_spinner=False, persist="disk")
+def _lengthened_episode_for(_lengthener, episode_title: str, episode_number: int, episode_outline: str,
+                            previous_episodes_summary: str, previous_cliffhanger: str, include_cliffhanger: bool,
+                            future_episodes_outlines: str, characters: List[Dict[str, Any]]):
+    return _lengthener.lengthen_episode(
+        episode_title=episode_title,
+        episode_number=episode_number,
+        episode_outline=episode_outline,
+        previous_episodes_summary=previous_episodes_summary,
+        previous_cliffhanger=previous_cliffhanger,
+        include_cliffhanger=include_cliffhanger,
+        future_episodes_outlines=future_episodes_outlines,
+        characters=characters
+    )
+
+@st.cache_data(show_spinner=False, persist="disk")
+def _dialogue_for(_dialogue_agent, story_type: str, storyline: str, characters: List[Dict[str, Any]]) -> str:
+    return _dialogue_agent.generate_dialogue(
+        story_type=story_type,
+        storyline=storyline,
+        characters=characters
+    )
+
+# Minimum time between intermediate status renders
+STATUS_RENDER_INTERVAL = 0.15
+_status_last_render = {}
+
+# Render a live status block for parallel steps
+def _render_status(placeholder, header, rows, final=False, force=False):
+    """
+    Render status rows into a placeholder.
+    
+    Intermediate frames are plain text (no frontend markdown parse) and throttled to one per
+    STATUS_RENDER_INTERVAL unless force is set; the final frame is rendered as markdown.
+    Returns True if the placeholder was updated.
+    """
+    key = id(placeholder)
+    if final:
+        placeholder.markdown(f"### {header}\n" + "\n".join(f"- {row}" for row in rows))
+        _status_last_render.pop(key, None)
+        return True
+    
+    now = time.monotonic()
+    if not force and now - _status_last_render.get(key, 0.0) <= STATUS_RENDER_INTERVAL:
+        return False
+    placeholder.text(header + "\n" + "\n".join(f"• {row}" for row in rows))
+    _status_last_render[key] = now
+    return True
+
 # Step 1: Generate Outline
 def generate_outline(topic: str):
     st.session_state.current_step = 0
     
     with st.spinner("Generating story outline..."):
-        outline_generator = OutlineGenerator()
-        st.session_state.outline = outline_generator.generate_outline(topic)
+        st.session_state.outline = _outline_for(topic)
     
     st.success("Outline generated!")
     st.session_state.current_step = 1
@@ -426,7 +610,7 @@ def generate_outline(topic: str):
 # Handle outline feedback
 def handle_outline_feedback(topic: str, feedback: str):
     with st.spinner("Refining outline based on your feedback..."):
-        outline_generator = OutlineGenerator()
+        outline_generator = get_agent("outline")
         
         # Clean the outline to remove any existing numbering before sending for refinement
         cleaned_outline = []
@@ -443,8 +627,7 @@ def handle_outline_feedback(topic: str, feedback: str):
 # Step 2: Develop Plot
 def develop_plot():
     with st.spinner("Developing detailed plot..."):
-        plot_agent = PlotSelectorAgent()
-        plot_result = plot_agent.generate_plot(st.session_state.outline)
+        plot_result = _uncached_fallback(_plot_for, st.session_state.outline)
         st.session_state.plot = plot_result.detailed_plot
         st.session_state.literary_elements = plot_result.literary_elements
     
@@ -455,8 +638,7 @@ def develop_plot():
 # Step 3: Create Characters
 def create_characters():
     with st.spinner("Developing characters..."):
-        character_agent = CharacterDevelopmentAgent()
-        st.session_state.characters = character_agent.generate_characters(st.session_state.plot)
+        st.session_state.characters = _uncached_fallback(_characters_for, st.session_state.plot)
     
     st.success("Characters created!")
     st.session_state.current_step = 3
@@ -465,7 +647,7 @@ def create_characters():
 # Handle character feedback
 def handle_character_feedback(feedback: str):
     with st.spinner("Refining characters based on your feedback..."):
-        character_agent = CharacterDevelopmentAgent()
+        character_agent = get_agent("character")
         refined_characters = character_agent.refine_characters(
             st.session_state.plot, 
             st.session_state.characters, 
@@ -478,12 +660,20 @@ def handle_character_feedback(feedback: str):
 # Step 4: Split into Episodes
 def split_into_episodes(num_episodes: int):
     with st.spinner("Splitting story into episodes..."):
-        splitter = StorySplitterAgent()
+        splitter = get_agent("splitter")
         st.session_state.episodes = splitter.split_story(
             st.session_state.plot, 
             st.session_state.characters, 
             num_episodes=num_episodes
         )
+        # Keep episodes ordered by number so later steps can iterate them without re-sorting,
+        # and index them once for the render path
+        st.session_state.episodes.sort(key=operator.attrgetter("number"))
+        st.session_state.sorted_episode_nums = [ep.number for ep in st.session_state.episodes]
+        st.session_state.episodes_by_num = {ep.number: ep for ep in st.session_state.episodes}
+        # Episodes changed - drop cached serialized forms
+        st.session_state.serialized_episodes = None
+        st.session_state.serialized_enhanced_episodes = None
     
     st.success("Episodes created!")
     st.session_state.current_step = 4
@@ -500,7 +690,7 @@ def enhance_episodes():
     status_text = st.empty()
     status_text.text("Preparing episode contexts...")
     
-    lengthener = EpisodeLengtheningAgent()
+    lengthener = get_agent("enhancer")
     enhanced_episodes = {}
     
     # Pre-compute episode contexts
@@ -539,7 +729,8 @@ def enhance_episodes():
     # Function to enhance a single episode
     def enhance_episode(context):
         episode = context["episode"]
-        enhanced = lengthener.lengthen_episode(
+        enhanced = _lengthened_episode_for(
+            lengthener,
             episode_title=context["episode_title"],
             episode_number=context["episode_number"],
             episode_outline=context["episode_outline"],
@@ -575,12 +766,15 @@ def enhance_episodes():
         # Submit all enhancement tasks
         future_to_episode = {executor.submit(enhance_episode, context): context for context in episode_contexts}
         
+        # Build one status row per episode; only the changed row is rebuilt on updates
+        title_by_num = {ep.number: ep.title for ep in st.session_state.episodes}
+        rows = {
+            num: f"Episode {num} ({title_by_num.get(num, '')}): {status}"
+            for num, status in episode_status_texts.items()
+        }
+        
         # Display initial status
-        episode_status_md = "### Episode Enhancement Status\n"
-        for episode_num, status in episode_status_texts.items():
-            episode_title = next((ep.title for ep in st.session_state.episodes if ep.number == episode_num), "")
-            episode_status_md += f"- Episode {episode_num} ({episode_title}): {status}\n"
-        episode_statuses.markdown(episode_status_md)
+        _render_status(episode_statuses, "Episode Enhancement Status", (rows[n] for n in sorted(rows)), force=True)
         
         # Process results as they complete
         for future in concurrent.futures.as_completed(future_to_episode):
@@ -595,17 +789,12 @@ def enhance_episodes():
                 
                 # Update status
                 completed_episodes += 1
-                episode_status_texts[episode_num] = "✅ Completed"
+                rows[episode_num] = f"Episode {episode_num} ({title_by_num.get(episode_num, '')}): ✅ Completed"
                 
-                # Update status display
-                episode_status_md = "### Episode Enhancement Status\n"
-                for ep_num, status in episode_status_texts.items():
-                    ep_title = next((ep.title for ep in st.session_state.episodes if ep.number == ep_num), "")
-                    episode_status_md += f"- Episode {ep_num} ({ep_title}): {status}\n"
-                episode_statuses.markdown(episode_status_md)
-                
-                # Update progress bar
-                progress_bar.progress(completed_episodes / len(episode_contexts))
+                # Update status display and progress bar
+                if _render_status(episode_statuses, "Episode Enhancement Status", (rows[n] for n in sorted(rows)),
+                                  final=completed_episodes == len(episode_contexts)):
+                    progress_bar.progress(completed_episodes / len(episode_contexts))
                 
             except Exception as e:
                 # Get the context for this future
@@ -613,14 +802,11 @@ def enhance_episodes():
                 episode_num = context["episode_number"]
                 
                 # Update status with error
-                episode_status_texts[episode_num] = f"❌ Error: {str(e)}"
-                episode_status_md = "### Episode Enhancement Status\n"
-                for ep_num, status in episode_status_texts.items():
-                    ep_title = next((ep.title for ep in st.session_state.episodes if ep.number == ep_num), "")
-                    episode_status_md += f"- Episode {ep_num} ({ep_title}): {status}\n"
-                episode_statuses.markdown(episode_status_md)
+                rows[episode_num] = f"Episode {episode_num} ({title_by_num.get(episode_num, '')}): ❌ Error: {str(e)}"
+                _render_status(episode_statuses, "Episode Enhancement Status", (rows[n] for n in sorted(rows)), force=True)
     
     st.session_state.enhanced_episodes = enhanced_episodes
+    st.session_state.serialized_enhanced_episodes = None  # Enhanced episodes changed
     st.session_state.current_step = 5
     progress_bar.empty()
     status_text.empty()
@@ -640,7 +826,7 @@ def generate_dialogue(story_type: str):
     status_text = st.empty()
     status_text.text("Preparing to generate dialogue...")
     
-    dialogue_agent = DialogueAgent()
+    dialogue_agent = get_agent("dialogue")
     dialogues = {}
     
     # Create episode data for parallel processing
@@ -690,11 +876,13 @@ def generate_dialogue(story_type: str):
                 episode_content = episode.content
             
             # Generate dialogue
-            dialogue = dialogue_agent.generate_dialogue(
-                story_type=story_type,
-                storyline=episode_content,
-                characters=characters  # Use the passed characters
-            )
+            with llm_semaphore():
+                dialogue = _dialogue_for(
+                    dialogue_agent,
+                    story_type=story_type,
+                    storyline=episode_content,
+                    characters=characters  # Use the passed characters
+                )
             
             # Validate dialogue output
             if not dialogue or len(dialogue.strip()) < 10:
@@ -743,12 +931,15 @@ def generate_dialogue(story_type: str):
         # Submit all dialogue generation tasks
         future_to_episode = {executor.submit(generate_episode_dialogue, data): data for data in episode_data}
         
+        # Build one status row per episode; only the changed row is rebuilt on updates
+        title_by_num = {ep.number: ep.title for ep in st.session_state.episodes}
+        rows = {
+            num: f"Episode {num} ({title_by_num[num]}): {status}"
+            for num, status in episode_status_texts.items()
+        }
+        
         # Display initial status
-        episode_status_md = "### Dialogue Generation Status\n"
-        for episode_num, status in episode_status_texts.items():
-            episode_title = next((ep.title for ep in st.session_state.episodes if ep.number == episode_num), "")
-            episode_status_md += f"- Episode {episode_num} ({episode_title}): {status}\n"
-        episode_statuses.markdown(episode_status_md)
+        _render_status(episode_statuses, "Dialogue Generation Status", (rows[n] for n in sorted(rows)), force=True)
         
         # Process results as they complete
         for future in concurrent.futures.as_completed(future_to_episode):
@@ -763,17 +954,12 @@ def generate_dialogue(story_type: str):
                 
                 # Update status
                 completed_episodes += 1
-                episode_status_texts[episode.number] = "✅ Completed"
+                rows[episode.number] = f"Episode {episode.number} ({title_by_num[episode.number]}): ✅ Completed"
                 
-                # Update status display
-                episode_status_md = "### Dialogue Generation Status\n"
-                for ep_num, status in episode_status_texts.items():
-                    ep_title = next((ep.title for ep in st.session_state.episodes if ep.number == ep_num), "")
-                    episode_status_md += f"- Episode {ep_num} ({ep_title}): {status}\n"
-                episode_statuses.markdown(episode_status_md)
-                
-                # Update progress bar
-                progress_bar.progress(completed_episodes / len(episode_data))
+                # Update status display and progress bar
+                if _render_status(episode_statuses, "Dialogue Generation Status", (rows[n] for n in sorted(rows)),
+                                  final=completed_episodes == len(episode_data)):
+                    progress_bar.progress(completed_episodes / len(episode_data))
                 
             except Exception as e:
                 # Get the data for this future
@@ -781,12 +967,8 @@ def generate_dialogue(story_type: str):
                 episode = data["episode"]
                 
                 # Update status with error
-                episode_status_texts[episode.number] = f"❌ Error: {str(e)}"
-                episode_status_md = "### Dialogue Generation Status\n"
-                for ep_num, status in episode_status_texts.items():
-                    ep_title = next((ep.title for ep in st.session_state.episodes if ep.number == ep_num), "")
-                    episode_status_md += f"- Episode {ep_num} ({ep_title}): {status}\n"
-                episode_statuses.markdown(episode_status_md)
+                rows[episode.number] = f"Episode {episode.number} ({title_by_num[episode.number]}): ❌ Error: {str(e)}"
+                _render_status(episode_statuses, "Dialogue Generation Status", (rows[n] for n in sorted(rows)), force=True)
     
     st.session_state.dialogues = dialogues
     st.session_state.current_step = 6
@@ -797,6 +979,44 @@ def generate_dialogue(story_type: str):
     st.success(f"Dialogue generated for {len(dialogues)} episodes!")
     return st.session_state.dialogues
 
+# Resolve the title, best available content and dialogue of every episode
+def resolve_episode_contents():
+    """Map each episode number to (title, content, dialogue), preferring enhanced content"""
+    resolved = {}
+    for ep in st.session_state.episodes:
+        enhanced = st.session_state.enhanced_episodes.get(ep.number)
+        content = (
+            getattr(enhanced, 'lengthened_content', None)
+            or (enhanced.get('lengthened_content') if isinstance(enhanced, dict) else None)
+            or ep.content
+        )
+        dialogue = st.session_state.dialogues.get(ep.number, "")
+        resolved[ep.number] = (ep.title, content, dialogue)
+    return resolved
+
+# Translate text through an on-disk cache keyed by content hash and language
+def cached_translate(translator, text: str, language: str, cache_dir: str) -> str:
+    """Return the translation of text, reusing a previous result for the same text and language"""
+    key = hashlib.sha256((language + "\0" + text).encode("utf-8")).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{key}.md")
+    
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    # Each chunk request takes its own slot from the shared LLM semaphore
+    translated = translator.translate_story(text, language, request_semaphore=llm_semaphore())
+    
+    # Don't persist failed chunks so they are retried next time
+    if "[Translation error" not in translated:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(translated)
+        os.replace(tmp_path, cache_path)
+    
+    return translated
+
 # Step 7: Translate Story
 def translate_story(target_languages: List[str]):
     if not target_languages:
@@ -825,198 +1045,240 @@ def translate_story(target_languages: List[str]):
     # Read the content of the final story from the story directory
     final_story_file = os.path.join(st.session_state.story_dir, "final_story.md")
     
+    story_content = None
+    
+    # Resolve each episode's title, content and dialogue once for every pass below
+    resolved = resolve_episode_contents()
+    
     # Check if the file exists
     if not os.path.exists(final_story_file):
         status_text.text("Final story file not found. Creating from available content...")
         
         # Create a combined story from available content
         try:
-            final_story_content = create_combined_story_for_translation()
+            final_story_content = create_combined_story_for_translation(resolved)
             
-            # Save the combined content to the final story file
-            with open(final_story_file, 'w', encoding='utf-8') as f:
+            # Save the combined content to the final story file atomically
+            tmp_file = final_story_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 f.write(final_story_content)
+            os.replace(tmp_file, final_story_file)
+            story_content = final_story_content
                 
             status_text.text("Created final story content for translation.")
         except Exception as e:
             st.error(f"Error creating final story content: {str(e)}")
             return []
     
-    # Read the content of the final story
-    with open(final_story_file, 'r', encoding='utf-8') as f:
-        story_content = f.read()
+    # Read the content of the final story unless it was just created
+    if story_content is None:
+        with open(final_story_file, 'r', encoding='utf-8') as f:
+            story_content = f.read()
         
     if not story_content or len(story_content) < 100:
         st.error("Story content is too short or empty. Cannot translate.")
         return []
     
     # Initialize translator agent
-    translator = TranslatorAgent()
+    translator = get_agent("translator")
     translated_files = []
     
-    # Function to translate to a single language
+    # Translations are cached per story so re-runs don't pay for identical requests again
+    translate_cache_dir = os.path.join(st.session_state.story_dir, ".tcache")
+    
+    # Fingerprint of the story being translated, used to skip unchanged re-runs
+    story_fp = hashlib.blake2b(story_content.encode("utf-8"), digest_size=16).hexdigest()
+    
+    # Function to translate the full story to a single language
     def translate_to_language(language):
         try:
+            translated_file = os.path.join(translations_dir, f"final_story_{language.lower()}.md")
+            fp_path = os.path.join(translations_dir, f".fp_{language.lower()}")
+            
+            # Skip the translation entirely if this exact story was already translated
+            if os.path.exists(translated_file) and os.path.exists(fp_path):
+                with open(fp_path, 'r', encoding='utf-8') as f:
+                    if f.read() == story_fp:
+                        return language, translated_file, None
+            
             # Translate the story
-            translated_content = translator.translate_story(story_content, language)
+            translated_content = cached_translate(translator, story_content, language, translate_cache_dir)
             
             # Save the translated content to a new file
-            translated_file = os.path.join(translations_dir, f"final_story_{language.lower()}.md")
-            with open(translated_file, 'w', encoding='utf-8') as f:
-                f.write(translated_content)
+            Path(translated_file).write_text(translated_content, encoding='utf-8')
             
-            # Also translate individual episodes if they exist
-            if st.session_state.episodes:
-                try:
-                    # Create a subdirectory for translated episodes
-                    translated_episodes_dir = os.path.join(st.session_state.story_dir, f"translated_{language.lower()}")
-                    os.makedirs(translated_episodes_dir, exist_ok=True)
-                    
-                    # Translate episodes in parallel (one language at a time)
-                    translate_episodes_for_language(language, translated_episodes_dir)
-                except Exception as e:
-                    st.warning(f"Failed to translate individual episodes to {language}: {str(e)}")
+            # Record which story content this translation was made from - only for a clean
+            # translation, so one with failed chunks is retried on the next run
+            if "[Translation error" not in translated_content:
+                tmp_fp_path = fp_path + ".tmp"
+                with open(tmp_fp_path, 'w', encoding='utf-8') as f:
+                    f.write(story_fp)
+                os.replace(tmp_fp_path, fp_path)
+            elif os.path.exists(fp_path):
+                os.remove(fp_path)
             
             return language, translated_file, None  # No error
         except Exception as e:
             return language, None, str(e)  # Return error
     
-    # Function to translate individual episodes for a language
-    def translate_episodes_for_language(language, translated_dir):
-        episode_statuses = {}
+    # Function to build the untranslated text of a single episode
+    def episode_content_for(episode):
+        title, content, dialogue_content = resolved[episode.number]
         
-        # Function to translate a single episode
-        def translate_episode(episode):
-            try:
-                # Get enhanced content if available
-                enhanced_episode = st.session_state.enhanced_episodes.get(episode.number)
-                enhanced_content = ""
-                
-                if enhanced_episode:
-                    if hasattr(enhanced_episode, 'lengthened_content'):
-                        enhanced_content = enhanced_episode.lengthened_content
-                    elif isinstance(enhanced_episode, dict) and 'lengthened_content' in enhanced_episode:
-                        enhanced_content = enhanced_episode['lengthened_content']
-                
-                if not enhanced_content:
-                    enhanced_content = episode.content
-                
-                dialogue_content = st.session_state.dialogues.get(episode.number, "")
-                
-                # Combine content for translation
-                episode_content = (
-                    f"# Episode {episode.number}: {episode.title}\n\n"
-                    f"{enhanced_content}\n\n"
-                    f"## Dialogue\n\n{dialogue_content}" if dialogue_content else ""
-                )
-                
-                # Translate the content
-                translated_content = translator.translate_story(episode_content, language)
-                
-                # Save to file
-                output_file = os.path.join(
-                    translated_dir, 
-                    f"episode_{episode.number}_{language.lower()}.md"
-                )
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(translated_content)
-                
-                return episode.number, {
-                    "translated_content": translated_content,
-                    "file_path": output_file
-                }
-            except Exception as e:
-                return episode.number, {"error": str(e)}
-        
-        # Limit concurrent API calls
-        max_workers = min(10, len(st.session_state.episodes))
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all translation tasks
-            future_to_episode = {
-                executor.submit(translate_episode, episode): episode 
-                for episode in st.session_state.episodes
-            }
-            
-            # Process results as they complete
-            for future in concurrent.futures.as_completed(future_to_episode):
-                try:
-                    episode_number, result = future.result()
-                    episode_statuses[episode_number] = result
-                except Exception as e:
-                    episode = future_to_episode[future]
-                    episode_statuses[episode.number] = {"error": str(e)}
+        # Combine content for translation
+        episode_content = (
+            f"# Episode {episode.number}: {title}\n\n"
+            f"{content}\n\n"
+        )
+        if dialogue_content:
+            episode_content += f"## Dialogue\n\n{dialogue_content}"
+        return episode_content
+    
+    # Function to save a translated episode and build its result entry
+    def save_episode_translation(language, episode_number, translated_content):
+        output_file = os.path.join(
+            st.session_state.story_dir,
+            f"translated_{language.lower()}",
+            f"episode_{episode_number}_{language.lower()}.md"
+        )
+        Path(output_file).write_text(translated_content, encoding='utf-8')
+        
+        return {
+            "translated_content": translated_content,
+            "file_path": output_file
+        }
+    
+    # Function to translate every episode of a language in a single request
+    def translate_episodes_batch(language):
+        episodes = st.session_state.episodes  # Already ordered by number
+        batched = "".join(f"\n\n<<<EP:{ep.number}>>>\n{episode_content_for(ep)}" for ep in episodes)
+        
+        translated = cached_translate(translator, batched, language, translate_cache_dir)
+        
+        # Reassemble {episode number: content} from the markers
+        parts = re.split(r"<<<EP:(\d+)>>>", translated)
+        split = {int(num): content.strip() for num, content in zip(parts[1::2], parts[2::2])}
+        if set(split) != {ep.number for ep in episodes}:
+            return language, None  # Markers were lost - caller falls back to per-episode requests
         
-        # Create a combined translated file with all episodes
+        return language, {
+            num: save_episode_translation(language, num, content)
+            for num, content in split.items()
+        }
+    
+    # Function to translate a single episode to a single language
+    def translate_episode(language, episode):
+        try:
+            translated_content = cached_translate(translator, episode_content_for(episode), language, translate_cache_dir)
+            return language, episode.number, save_episode_translation(language, episode.number, translated_content)
+        except Exception as e:
+            return language, episode.number, {"error": str(e)}
+    
+    # Function to write the combined translated file with all episodes for a language
+    def write_combined_translation(language, episode_results):
         combined_file = os.path.join(st.session_state.story_dir, f"full_story_{language.lower()}.md")
         
         try:
             with open(combined_file, 'w', encoding='utf-8') as f:
-                for episode in sorted(st.session_state.episodes, key=lambda e: e.number):
-                    translation = episode_statuses.get(episode.number, {}).get('translated_content')
+                for episode in st.session_state.episodes:  # Already ordered by number
+                    translation = episode_results.get(episode.number, {}).get('translated_content')
                     if translation:
                         f.write(f"{translation}\n\n---\n\n")
         except Exception as e:
-            st.warning(f"Error creating combined translation file: {str(e)}")
-        
-        return episode_statuses
+            st.warning(f"Error creating combined translation file for {language}: {str(e)}")
+    
+    # Create a subdirectory for translated episodes of each language
+    for lang in target_languages:
+        os.makedirs(os.path.join(st.session_state.story_dir, f"translated_{lang.lower()}"), exist_ok=True)
     
     # Create a placeholder for language statuses
     language_statuses = st.empty()
     language_status_texts = {lang: "Pending" for lang in target_languages}
     
+    # Build one status row per language; only the changed row is rebuilt on updates
+    language_rows = {lang: f"{lang}: {status}" for lang, status in language_status_texts.items()}
+    
     # Display initial status
-    language_status_md = "### Translation Status\n"
-    for lang, status in language_status_texts.items():
-        language_status_md += f"- {lang}: {status}\n"
-    language_statuses.markdown(language_status_md)
+    _render_status(language_statuses, "Translation Status", language_rows.values(), force=True)
     
-    # Determine number of workers - limit based on available processors and API rate limits
-    max_workers = min(len(target_languages), 10)  # Limiting to 3 concurrent API calls
+    # A single pool runs the full-story and episode translations of every language
+    # so one language's slowest request doesn't hold back the others
+    max_workers = 20
     
     # Shared variable for completed translations count
     completed_translations = 0
     
+    # Episode translation results keyed by language -> {episode number: result}
+    episode_translations = defaultdict(dict)
+    
     # Process translations in parallel
     status_text.text("Translating in parallel...")
     
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all translation tasks
+        # Submit all translation tasks - episodes go out as one batched request per language
         future_to_language = {executor.submit(translate_to_language, lang): lang for lang in target_languages}
-        
-        # Process results as they complete
-        for future in concurrent.futures.as_completed(future_to_language):
-            try:
-                language, file_path, error = future.result()
-                
-                # Update status
-                completed_translations += 1
-                
-                if error:
-                    language_status_texts[language] = f"❌ Error: {error}"
-                    st.error(f"Error translating to {language}: {error}")
-                else:
-                    language_status_texts[language] = "✅ Completed"
-                    translated_files.append((language, file_path))
-                
-                # Update status display
-                language_status_md = "### Translation Status\n"
-                for lang, status in language_status_texts.items():
-                    language_status_md += f"- {lang}: {status}\n"
-                language_statuses.markdown(language_status_md)
-                
-                # Update progress bar
-                progress_bar.progress(completed_translations / len(target_languages))
+        future_to_batch = {}
+        if st.session_state.episodes:
+            future_to_batch = {executor.submit(translate_episodes_batch, lang): lang for lang in target_languages}
+        future_to_episode = {}
+        
+        # Process results as they complete; fallback tasks may be added while waiting
+        pending = {*future_to_language, *future_to_batch}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future in future_to_batch:
+                    language = future_to_batch[future]
+                    try:
+                        _, results = future.result()
+                    except Exception:
+                        results = None
+                    
+                    if results is None:
+                        # Fall back to one translation request per episode
+                        for episode in st.session_state.episodes:
+                            episode_future = executor.submit(translate_episode, language, episode)
+                            future_to_episode[episode_future] = (language, episode)
+                            pending.add(episode_future)
+                    else:
+                        episode_translations[language].update(results)
+                    continue
                 
-            except Exception as e:
-                # Get the language for this future
-                language = future_to_language[future]
+                if future in future_to_episode:
+                    language, episode_number, result = future.result()
+                    episode_translations[language][episode_number] = result
+                    continue
                 
-                # Update status with error
-                language_status_texts[language] = f"❌ Error: {str(e)}"
-                language_status_md = "### Translation Status\n"
-                for lang, status in language_status_texts.items():
-                    language_status_md += f"- {lang}: {status}\n"
-                language_statuses.markdown(language_status_md)
+                try:
+                    language, file_path, error = future.result()
+                    
+                    # Update status
+                    completed_translations += 1
+                    
+                    if error:
+                        language_rows[language] = f"{language}: ❌ Error: {error}"
+                        st.error(f"Error translating to {language}: {error}")
+                    else:
+                        language_rows[language] = f"{language}: ✅ Completed"
+                        translated_files.append((language, file_path))
+                    
+                    # Update status display and progress bar
+                    if _render_status(language_statuses, "Translation Status", language_rows.values(),
+                                      final=completed_translations == len(target_languages)):
+                        progress_bar.progress(completed_translations / len(target_languages))
+                    
+                except Exception as e:
+                    # Get the language for this future
+                    language = future_to_language[future]
+                    
+                    # Update status with error
+                    language_rows[language] = f"{language}: ❌ Error: {str(e)}"
+                    _render_status(language_statuses, "Translation Status", language_rows.values(), force=True)
+    
+    # Rebuild the combined translated file once all episodes of a language are back
+    if st.session_state.episodes:
+        for lang in target_languages:
+            write_combined_translation(lang, episode_translations[lang])
     
     progress_bar.empty()
     status_text.empty()
@@ -1027,24 +1289,18 @@ def translate_story(target_languages: List[str]):
         
         # Update story data with translations and save it again
         try:
-            # First read the existing story data from the JSON file
+            # Patch the in-memory story data; only read the JSON file if it isn't loaded
             story_data_path = os.path.join(st.session_state.story_dir, "story_data.json")
-            with open(story_data_path, 'r', encoding='utf-8') as f:
-                story_data = json.load(f)
+            story_data = st.session_state.story_data
+            if not story_data:
+                with open(story_data_path, 'r', encoding='utf-8') as f:
+                    story_data = json.load(f)
             
             # Update the translations field
             story_data["translations"] = [lang for lang, _ in translated_files]
             
             # Write the updated story data back to the file
-            class CustomEncoder(json.JSONEncoder):
-                def default(self, obj):
-                    if hasattr(obj, '__dict__'):
-                        return obj.__dict__
-                    return str(obj)
-            
-            # Save the updated JSON file
-            with open(story_data_path, 'w', encoding='utf-8') as f:
-                json.dump(story_data, f, indent=2, ensure_ascii=False, cls=CustomEncoder)
+            write_story_data(story_data, story_data_path)
                 
             # Also update the session state
             st.session_state.story_data = story_data
@@ -1057,48 +1313,41 @@ def translate_story(target_languages: List[str]):
     return translated_files
 
 # Helper function to create combined story content for translation if final_story.md doesn't exist yet
-def create_combined_story_for_translation():
+def create_combined_story_for_translation(resolved=None):
     """Create a combined story from episodes with dialogue for translation"""
-    combined_content = f"# {st.session_state.topic}\n\n"
+    if resolved is None:
+        resolved = resolve_episode_contents()
+    
+    # Collect fragments and join once at the end instead of growing a string
+    parts = [f"# {st.session_state.topic}\n\n"]
     
     # Characters introduction
-    combined_content += "## Characters\n\n"
+    parts.append("## Characters\n\n")
     for char in st.session_state.characters:
-        combined_content += f"**{char['name']}** ({char['role']}): {char['description']}\n\n"
+        parts.append(f"**{char['name']}** ({char['role']}): {char['description']}\n\n")
     
     # Episodes with dialogues
-    combined_content += "## Story\n\n"
+    parts.append("## Story\n\n")
     
-    # Ensure episodes are in correct order
-    sorted_episodes = sorted(st.session_state.episodes, key=lambda ep: ep.number)
+    # Episodes are kept ordered by number since split_into_episodes
+    sorted_episodes = st.session_state.episodes
     
     for episode in sorted_episodes:
         episode_num = episode.number
+        title, content, dialogue = resolved[episode_num]
         
-        # Get dialogue for this episode
-        dialogue = st.session_state.dialogues.get(episode_num, "")
-        
-        # If no dialogue, get enhanced content
+        # If no dialogue, use the (enhanced) content
         if not dialogue:
-            enhanced_episode = st.session_state.enhanced_episodes.get(episode_num)
-            if enhanced_episode:
-                if isinstance(enhanced_episode, dict) and 'lengthened_content' in enhanced_episode:
-                    dialogue = enhanced_episode['lengthened_content']
-                elif hasattr(enhanced_episode, 'lengthened_content'):
-                    dialogue = enhanced_episode.lengthened_content
-                else:
-                    dialogue = episode.content
-            else:
-                dialogue = episode.content
+            dialogue = content
         
-        combined_content += f"### Episode {episode_num}: {episode.title}\n\n"
-        combined_content += f"{dialogue}\n\n"
+        parts.append(f"### Episode {episode_num}: {title}\n\n")
+        parts.append(f"{dialogue}\n\n")
         
         # Add a separator between episodes
         if episode_num < len(sorted_episodes):
-            combined_content += "---\n\n"
+            parts.append("---\n\n")
     
-    return combined_content
+    return "".join(parts)
 
 # Function to finalize story
 def finalize_story(topic, story_type, target_languages=None, generate_audio=False):
@@ -1111,47 +1360,51 @@ def finalize_story(topic, story_type, target_languages=None, generate_audio=Fals
             st.error(f"Failed to create story directory: {story_dir}")
             return None, None
             
-        # Check that the required subdirectories exist
+        # Ensure the required subdirectories exist (exist_ok makes a prior check redundant)
         episodes_dir = os.path.join(story_dir, "episodes")
         dialogue_dir = os.path.join(story_dir, "dialogue")
         translations_dir = os.path.join(story_dir, "translations")
         audio_dir = os.path.join(story_dir, "audio")
         
-        if not os.path.exists(episodes_dir):
-            os.makedirs(episodes_dir, exist_ok=True)
-        if not os.path.exists(dialogue_dir):
-            os.makedirs(dialogue_dir, exist_ok=True)
-        if not os.path.exists(translations_dir):
-            os.makedirs(translations_dir, exist_ok=True)
-        if not os.path.exists(audio_dir):
-            os.makedirs(audio_dir, exist_ok=True)
+        os.makedirs(episodes_dir, exist_ok=True)
+        os.makedirs(dialogue_dir, exist_ok=True)
+        os.makedirs(translations_dir, exist_ok=True)
+        os.makedirs(audio_dir, exist_ok=True)
             
         # Set the session state after directory verification
         st.session_state.story_dir = story_dir
         
-        # Prepare serializable enhanced episodes
-        serializable_enhanced_episodes = {}
-        for num, ep in st.session_state.enhanced_episodes.items():
-            if hasattr(ep, 'lengthened_content'):
-                serializable_enhanced_episodes[num] = {
-                    "lengthened_content": ep.lengthened_content,
-                    "engagement_points": getattr(ep, 'engagement_points', []),
-                    "summary": getattr(ep, 'summary', "")
+        # Prepare serializable enhanced episodes - reused until the enhanced episodes change
+        if st.session_state.serialized_enhanced_episodes is None:
+            serializable_enhanced_episodes = {}
+            for num, ep in st.session_state.enhanced_episodes.items():
+                if hasattr(ep, 'lengthened_content'):
+                    serializable_enhanced_episodes[num] = {
+                        "lengthened_content": ep.lengthened_content,
+                        "engagement_points": getattr(ep, 'engagement_points', []),
+                        "summary": getattr(ep, 'summary', "")
+                    }
+                else:
+                    serializable_enhanced_episodes[num] = ep
+            st.session_state.serialized_enhanced_episodes = serializable_enhanced_episodes
+        serializable_enhanced_episodes = st.session_state.serialized_enhanced_episodes
+        
+        # Prepare serializable episodes - converting Episode objects to dictionaries,
+        # reused until the episodes change
+        if st.session_state.serialized_episodes is None:
+            serializable_episodes = []
+            for episode in st.session_state.episodes:
+                serializable_episode = {
+                    "number": episode.number,
+                    "title": episode.title,
+                    "content": episode.content,
+                    "cliffhanger": episode.cliffhanger if hasattr(episode, 'cliffhanger') else "",
+                    "has_audio": False  # Default value, will be updated if audio is generated
                 }
-            else:
-                serializable_enhanced_episodes[num] = ep
-        
-        # Prepare serializable episodes - converting Episode objects to dictionaries
-        serializable_episodes = []
-        for episode in st.session_state.episodes:
-            serializable_episode = {
-                "number": episode.number,
-                "title": episode.title,
-                "content": episode.content,
-                "cliffhanger": episode.cliffhanger if hasattr(episode, 'cliffhanger') else "",
-                "has_audio": False  # Default value, will be updated if audio is generated
-            }
-            serializable_episodes.append(serializable_episode)
+                serializable_episodes.append(serializable_episode)
+            st.session_state.serialized_episodes = serializable_episodes
+        # Copy the cached entries so per-run fields like has_audio don't leak into later saves
+        serializable_episodes = [dict(episode) for episode in st.session_state.serialized_episodes]
         
         # Prepare serializable dialogues
         serializable_dialogues = {}
@@ -1178,26 +1431,27 @@ def finalize_story(topic, story_type, target_languages=None, generate_audio=Fals
         if generate_audio:
             try:
                 st.write("Generating audio for episodes...")
-                tts_agent = TextToSpeechAgent()
+                tts_agent = get_agent("tts")
+                
+                # Resolve the text to speak for an episode, preferring enhanced content
+                def content_for(episode):
+                    enhanced_episode = serializable_enhanced_episodes.get(episode.number)
+                    if enhanced_episode and 'lengthened_content' in enhanced_episode:
+                        return enhanced_episode['lengthened_content']
+                    return episode.content
                 
-                for i, episode in enumerate(st.session_state.episodes):
-                    with st.spinner(f"Generating audio for Episode {episode.number}..."):
-                        # Get enhanced content if available
-                        content = episode.content
-                        enhanced_episode = serializable_enhanced_episodes.get(episode.number)
-                        if enhanced_episode and 'lengthened_content' in enhanced_episode:
-                            content = enhanced_episode['lengthened_content']
-                        
-                        # Generate audio
-                        audio_path = tts_agent.generate_episode_audio(
-                            content, 
-                            episode.number, 
-                            story_dir
-                        )
-                        
-                        # Update the serializable episode with audio info
-                        if audio_path and os.path.exists(audio_path):
-                            serializable_episodes[i]["has_audio"] = True
+                episodes = st.session_state.episodes
+                with st.spinner(f"Generating audio for {len(episodes)} episodes in parallel..."):
+                    audio_paths = asyncio.run(tts_agent.generate_all_episode_audio(
+                        {episode.number: content_for(episode) for episode in episodes},
+                        story_dir
+                    ))
+                
+                # Update the serializable episodes with audio info
+                for i, episode in enumerate(episodes):
+                    audio_path = audio_paths.get(episode.number)
+                    if audio_path and os.path.exists(audio_path):
+                        serializable_episodes[i]["has_audio"] = True
                 
                 # Update story data with audio info
                 story_data["episodes"] = serializable_episodes
@@ -1205,17 +1459,9 @@ def finalize_story(topic, story_type, target_languages=None, generate_audio=Fals
             except Exception as e:
                 st.warning(f"Audio generation encountered an issue: {str(e)}")
         
-        # Ensure the JSON file is saved correctly using a custom encoder for non-serializable objects
-        class CustomEncoder(json.JSONEncoder):
-            def default(self, obj):
-                if hasattr(obj, '__dict__'):
-                    return obj.__dict__
-                return str(obj)
-        
-        # Save the JSON file with the custom encoder
+        # Save the JSON file, falling back to attribute dicts for non-serializable objects
         story_data_path = os.path.join(story_dir, "story_data.json")
-        with open(story_data_path, 'w', encoding='utf-8') as f:
-            json.dump(story_data, f, indent=2, ensure_ascii=False, cls=CustomEncoder)
+        write_story_data(story_data, story_data_path)
         
         # Also save the story in other formats
         st.session_state.story_data = story_data
@@ -1231,6 +1477,137 @@ def finalize_story(topic, story_type, target_languages=None, generate_audio=Fals
         st.error(traceback.format_exc())
         return None, None
 
+# Read a text file once per modification
+@st.cache_data(show_spinner=False, max_entries=32)
+def read_text(path: str, mtime: float) -> str:
+    """Return the contents of a UTF-8 text file; mtime only serves to invalidate the cache"""
+    return Path(path).read_text(encoding='utf-8')
+
+# Latest modification time of the story directory and its subdirectories - changes
+# whenever a file is added to or removed from the story
+def story_tree_mtime(story_dir):
+    mtime = os.path.getmtime(story_dir)
+    with os.scandir(story_dir) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                mtime = max(mtime, entry.stat().st_mtime)
+    return mtime
+
+# Recursively yield the downloadable files under a directory using os.scandir
+def walk_story_files(directory):
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # Skip internal caches such as the translation cache and fingerprints
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_story_files(entry.path)
+            elif entry.name != "story_files.zip":
+                yield entry.path
+
+# List the story files once per change of the directory tree
+@st.cache_data(show_spinner=False, max_entries=32)
+def list_story_files(story_dir: str, dir_mtime: float) -> List[str]:
+    """Return the downloadable files under story_dir; dir_mtime only serves to invalidate the cache"""
+    return list(walk_story_files(story_dir))
+
+# Zip the story files in memory for download
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_story_zip(story_dir: str, files: List[str], mtime: float) -> bytes:
+    """Return a ZIP archive of the story files; mtime only serves to invalidate the cache"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as zipf:
+        for file_path in files:
+            zipf.write(file_path, os.path.relpath(file_path, story_dir))
+    return buffer.getvalue()
+
+# Bundle the story files as a zstd-compressed tarball (requires zstandard)
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_story_tar_zst(story_dir: str, files: List[str], mtime: float) -> bytes:
+    """Return a .tar.zst archive of the story files; mtime only serves to invalidate the cache"""
+    buffer = io.BytesIO()
+    cctx = zstd.ZstdCompressor(level=9, threads=-1)
+    with cctx.stream_writer(buffer, closefd=False) as writer:
+        with tarfile.open(fileobj=writer, mode='w|') as tar:
+            for file_path in files:
+                tar.add(file_path, arcname=os.path.relpath(file_path, story_dir))
+    return buffer.getvalue()
+
+# Download options and story preview - a fragment, so downloads don't rerun the whole app
+@st.fragment
+def render_downloads():
+    """Render the download buttons and preview for the finished story"""
+    st.markdown("<h3>Download Options</h3>", unsafe_allow_html=True)
+    
+    if st.session_state.story_dir:
+        # List the story files once and reuse the listing for bundling and existence checks
+        story_files = list_story_files(
+            st.session_state.story_dir,
+            story_tree_mtime(st.session_state.story_dir)
+        )
+        story_file_set = set(story_files)
+        files_mtime = max((os.path.getmtime(path) for path in story_files), default=0.0)
+        
+        # Build a ZIP of all story files in memory (cached until a file changes)
+        zip_content = build_story_zip(st.session_state.story_dir, story_files, files_mtime)
+        
+        # Complete story
+        final_story_path = os.path.join(st.session_state.story_dir, "final_story.md")
+        
+        if final_story_path in story_file_set:
+            final_story_content = read_text(final_story_path, os.path.getmtime(final_story_path))
+            
+            st.download_button(
+                label="Download Complete Story (MD)",
+                data=final_story_content,
+                file_name="final_story.md",
+                mime="text/markdown",
+                key="download_final_story"
+            )
+        
+        # Download ZIP file
+        st.download_button(
+            label="Download All Story Files (ZIP)",
+            data=zip_content,
+            file_name="story_files.zip",
+            mime="application/zip",
+            key="download_story_zip"
+        )
+        
+        # Smaller, faster-to-build tarball when zstandard is installed
+        if zstd is not None:
+            st.download_button(
+                label="Download All Story Files (TAR.ZST)",
+                data=build_story_tar_zst(st.session_state.story_dir, story_files, files_mtime),
+                file_name="story_files.tar.zst",
+                mime="application/zstd",
+                key="download_story_tar_zst"
+            )
+        
+        # Show translated versions if available
+        if hasattr(st.session_state, 'translated_files') and st.session_state.translated_files:
+            st.markdown("<h3>Translated Versions</h3>", unsafe_allow_html=True)
+            
+            for lang, file_path in st.session_state.translated_files:
+                if file_path in story_file_set:
+                    translated_content = read_text(file_path, os.path.getmtime(file_path))
+                    
+                    st.download_button(
+                        label=f"Download {lang} Version (MD)",
+                        data=translated_content,
+                        file_name=f"final_story_{lang.lower()}.md",
+                        mime="text/markdown",
+                        key=f"download_{lang.lower()}"
+                    )
+        
+        # Show story preview
+        st.markdown("<h3>Story Preview</h3>", unsafe_allow_html=True)
+        
+        if final_story_path in story_file_set:
+            # Show first 1000 characters as preview, sliced from the cached read above
+            preview = final_story_content[:1000] + "..." if len(final_story_content) > 1000 else final_story_content
+            st.text_area("Preview", preview, height=200)
+
 # Main app function
 def main():
     # Initialize session state
@@ -1407,8 +1784,7 @@ def main():
                     st.markdown(f"<p class='cliffhanger'>Cliffhanger: {episode.cliffhanger}</p>", unsafe_allow_html=True)
 
                 # Add audio button for each episode
-                if st.button(f"🔊 Listen to Episode {episode.number}", key=f"audio_ep4_{episode.number}"):
-                    play_episode_audio(episode.number)
+                episode_audio_button(episode.number, f"🔊 Listen to Episode {episode.number}")
         
         # Progress button
         if st.button("Enhance Episodes"):
@@ -1420,18 +1796,15 @@ def main():
     elif st.session_state.current_step == 5:
         st.markdown("<h2 class='sub-header'>Enhanced Episodes</h2>", unsafe_allow_html=True)
         
-        # Sort episode numbers to ensure they display in order
-        sorted_episode_nums = sorted(st.session_state.enhanced_episodes.keys())
+        # Episode numbers in display order, computed once when the episodes were split
+        sorted_episode_nums = st.session_state.sorted_episode_nums
         
         # Show enhanced episodes in correct order
         for episode_num in sorted_episode_nums:
             enhanced = st.session_state.enhanced_episodes.get(episode_num)
             
             # Find the original episode
-            original_episode = next(
-                (ep for ep in st.session_state.episodes if ep.number == episode_num), 
-                None
-            )
+            original_episode = st.session_state.episodes_by_num.get(episode_num)
             
             if original_episode and enhanced:
                 title = original_episode.title
@@ -1440,8 +1813,7 @@ def main():
                         st.write(enhanced.lengthened_content)
                     else:
                         st.write(enhanced.get('lengthened_content', 'Content not available'))
-                    if st.button(f"🔊 Listen to Episode {episode_num}", key=f"audio_ep5_{episode_num}"):
-                        play_episode_audio(episode_num)
+                    episode_audio_button(episode_num, f"🔊 Listen to Episode {episode_num}")
         
         # Progress button
         if st.button("Generate Dialogue"):
@@ -1469,8 +1841,8 @@ def main():
         
         # Show tabs for episodes with dialogue
         if st.session_state.episodes:
-            # Sort episodes by episode number to ensure proper ordering
-            sorted_episodes = sorted(st.session_state.episodes, key=lambda ep: ep.number)
+            # Episodes are kept ordered by number since they were split
+            sorted_episodes = st.session_state.episodes
             tab_titles = [f"Episode {ep.number}: {ep.title}" for ep in sorted_episodes]
             tabs = st.tabs(tab_titles)
             
@@ -1479,22 +1851,12 @@ def main():
                     episode = sorted_episodes[i]
                     episode_num = episode.number
                     
-                    # Display episode content
-                    enhanced = st.session_state.enhanced_episodes.get(episode_num)
-                    content = ""
-                    if enhanced:
-                        if hasattr(enhanced, 'lengthened_content'):
-                            content = enhanced.lengthened_content
-                        else:
-                            content = enhanced.get('lengthened_content', '')
-                    
                     # # Add audio player at the top of each tab
                     # col1, col2 = st.columns([3, 1])
                     # with col1:
                     #     st.markdown("<h3>Episode Content</h3>", unsafe_allow_html=True)
                     # with col2:
-                    #     if st.button(f"🔊 Listen", key=f"audio_ep6_{episode_num}"):
-                    #         play_episode_audio(episode_num)
+                    #     episode_audio_button(episode_num, "🔊 Listen")
                     
                     # st.write(content)
                     
@@ -1553,83 +1915,13 @@ def main():
         # Create episode audio player buttons
         cols = st.columns(min(3, len(st.session_state.episodes)))  # Up to 3 columns
         
-        for i, episode in enumerate(sorted(st.session_state.episodes, key=lambda ep: ep.number)):
+        for i, episode in enumerate(st.session_state.episodes):  # Already ordered by number
             with cols[i % 3]:
                 st.markdown(f"**Episode {episode.number}: {episode.title}**")
-                if st.button(f"🔊 Play", key=f"audio_ep7_{episode.number}"):
-                    play_episode_audio(episode.number)
+                episode_audio_button(episode.number, "🔊 Play")
 
-        # Show download options
-        st.markdown("<h3>Download Options</h3>", unsafe_allow_html=True)
-        
-        if st.session_state.story_dir:
-            # Create a ZIP file containing all story files
-            zip_path = os.path.join(st.session_state.story_dir, "story_files.zip")
-            
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Add all files from the story directory
-                for root, dirs, files in os.walk(st.session_state.story_dir):
-                    for file in files:
-                        if file != "story_files.zip":  # Don't include the zip file itself
-                            file_path = os.path.join(root, file)
-                            arcname = os.path.relpath(file_path, st.session_state.story_dir)
-                            zipf.write(file_path, arcname)
-            
-            # Complete story
-            final_story_path = os.path.join(st.session_state.story_dir, "final_story.md")
-            
-            if os.path.exists(final_story_path):
-                with open(final_story_path, 'r', encoding='utf-8') as f:
-                    final_story_content = f.read()
-                
-                st.download_button(
-                    label="Download Complete Story (MD)",
-                    data=final_story_content,
-                    file_name="final_story.md",
-                    mime="text/markdown",
-                    key="download_final_story"
-                )
-            
-            # Download ZIP file
-            if os.path.exists(zip_path):
-                with open(zip_path, 'rb') as f:
-                    zip_content = f.read()
-                
-                st.download_button(
-                    label="Download All Story Files (ZIP)",
-                    data=zip_content,
-                    file_name="story_files.zip",
-                    mime="application/zip",
-                    key="download_story_zip"
-                )
-            
-            # Show translated versions if available
-            if hasattr(st.session_state, 'translated_files') and st.session_state.translated_files:
-                st.markdown("<h3>Translated Versions</h3>", unsafe_allow_html=True)
-                
-                for lang, file_path in st.session_state.translated_files:
-                    if os.path.exists(file_path):
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            translated_content = f.read()
-                        
-                        st.download_button(
-                            label=f"Download {lang} Version (MD)",
-                            data=translated_content,
-                            file_name=f"final_story_{lang.lower()}.md",
-                            mime="text/markdown",
-                            key=f"download_{lang.lower()}"
-                        )
-            
-            # Show story preview
-            st.markdown("<h3>Story Preview</h3>", unsafe_allow_html=True)
-            
-            if os.path.exists(final_story_path):
-                with open(final_story_path, 'r', encoding='utf-8') as f:
-                    preview_content = f.read()
-                
-                # Show first 1000 characters as preview
-                preview = preview_content[:1000] + "..." if len(preview_content) > 1000 else preview_content
-                st.text_area("Preview", preview, height=200)
+        # Download options and preview
+        render_downloads()
         
         # Generate new story button
         if st.button("Generate New Story"):
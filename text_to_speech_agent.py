@@ -1,182 +1,323 @@
-import asyncio
-import os
-import json
-from pathlib import Path
-from typing import Optional, List, Dict, Any
-from openai import AsyncOpenAI, OpenAI
-from openai.helpers import LocalAudioPlayer
-from dotenv import load_dotenv
-import streamlit as st
-
-# Load environment variables
-load_dotenv()
-
-class TextToSpeechAgent:
-    """Agent for converting text to speech using OpenAI's TTS API."""
-    
-    def __init__(self, api_key=None):
-        """
-        Initialize the text-to-speech agent.
-        
-        Args:
-            api_key (str, optional): API key for OpenAI. If not provided, it will be loaded from environment.
-        """
-        # Load API key from environment if not provided
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
-            
-        # Initialize OpenAI clients (sync and async)
-        self.sync_client = OpenAI(api_key=self.api_key)
-        self.async_client = AsyncOpenAI(api_key=self.api_key)
-        
-        # Default TTS parameters
-        self.model = "gpt-4o-mini-tts"  # Use tts-1 for higher quality or tts-1-hd for highest quality
-        self.voice = "nova"   # Options: alloy, echo, fable, onyx, nova, shimmer
-    
-    async def stream_audio(self, text: str, voice: str = None, instructions: str = "Speak in a natural and engaging tone.") -> None:
-        """
-        Stream audio directly to speakers using OpenAI's streaming API.
-        
-        Args:
-            text (str): The text to convert to speech
-            voice (str, optional): Voice to use. Defaults to the instance's default voice.
-            instructions (str, optional): Instructions for the speech style.
-        """
-        voice_to_use = voice or self.voice
-        
-        try:
-            # Truncate very long text to avoid API limits
-            max_chars = 4000  # OpenAI's limit is around 4096 chars
-            if len(text) > max_chars:
-                print(f"Text too long ({len(text)} chars), truncating to {max_chars} chars")
-                text = text[:max_chars] + "..."
-            
-            print(f"Streaming audio with voice: {voice_to_use}")
-            async with self.async_client.audio.speech.with_streaming_response.create(
-                model=self.model,
-                voice=voice_to_use,
-                input=text,
-                instructions=instructions,
-                response_format="mp3",  # or "pcm" for raw audio
-            ) as response:
-                await LocalAudioPlayer().play(response)
-                
-            print("Audio streaming completed")
-            return True
-            
-        except Exception as e:
-            print(f"Error streaming audio: {str(e)}")
-            return False
-    
-    def generate_speech(self, text: str, output_path: str = None, voice: str = None) -> Optional[str]:
-        """
-        Generate audio file from text using OpenAI's TTS API.
-        
-        Args:
-            text (str): The text to convert to speech
-            output_path (str, optional): Path to save the audio file. Defaults to 'speech.mp3'.
-            voice (str, optional): Voice to use. Defaults to the instance's default voice.
-            
-        Returns:
-            str: Path to the generated audio file or None on failure
-        """
-        if output_path is None:
-            output_path = "speech.mp3"
-            
-        voice_to_use = voice or self.voice
-            
-        try:
-            # Truncate very long text to avoid API limits
-            max_chars = 4000  # OpenAI's limit is around 4096 chars
-            if len(text) > max_chars:
-                print(f"Text too long ({len(text)} chars), truncating to {max_chars} chars")
-                text = text[:max_chars] + "..."
-            
-            print(f"Generating audio with voice: {voice_to_use}")
-            response = self.sync_client.audio.speech.create(
-                model=self.model,
-                voice=voice_to_use,
-                input=text,
-                response_format="mp3"
-            )
-            
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
-            
-            # Save audio to file
-            response.stream_to_file(output_path)
-            print(f"Audio saved to: {output_path}")
-            
-            return output_path
-        except Exception as e:
-            print(f"Error generating speech: {str(e)}")
-            return None
-    
-    def generate_episode_audio(self, episode_content: str, episode_number: int, output_dir: str) -> Optional[str]:
-        """
-        Generate audio for a specific episode and save it to the specified directory.
-        
-        Args:
-            episode_content (str): The text content of the episode
-            episode_number (int): The episode number
-            output_dir (str): Directory to save the audio files
-            
-        Returns:
-            str: Path to the generated audio file
-        """
-        # Create audio directory if it doesn't exist
-        audio_dir = os.path.join(output_dir, "audio")
-        os.makedirs(audio_dir, exist_ok=True)
-        
-        # Create output path for this episode
-        output_path = os.path.join(audio_dir, f"episode_{episode_number}.mp3")
-        
-        # Truncate very long episodes to avoid API limits
-        max_chars = 4000  # OpenAI typically has character limits for TTS requests
-        if len(episode_content) > max_chars:
-            print(f"Episode content too long ({len(episode_content)} chars), truncating to {max_chars} chars")
-            episode_content = episode_content[:max_chars] + "..."
-        
-        # Generate audio
-        return self.generate_speech(episode_content, output_path)
-    
-    async def play_episode_audio(self, episode_content: str, voice: str = None) -> bool:
-        """
-        Play episode audio directly using streaming API.
-        
-        Args:
-            episode_content (str): The text content of the episode
-            voice (str, optional): Voice to use. Defaults to the instance's default voice.
-            
-        Returns:
-            bool: True if successful, False otherwise
-        """
-        return await self.stream_audio(episode_content, voice)
-
-
-# Example usage
-if __name__ == "__main__":
-    # Test the streaming functionality
-    async def test_streaming():
-        agent = TextToSpeechAgent()
-        text = "Today is a wonderful day to build something people love!"
-        await agent.stream_audio(text, voice="nova")
-    
-    # Test the file generation functionality
-    def test_file_generation():
-        agent = TextToSpeechAgent()
-        text = "Today is a wonderful day to build something people love!"
-        audio_path = agent.generate_speech(text)
-        if audio_path:
-            print(f"Audio generated successfully at: {audio_path}")
-        else:
-            print("Failed to generate audio")
-    
-    # Run the async test
-    asyncio.run(test_streaming())
-    
-    # Run the sync test
-    test_file_generation()
-
-
+import asyncio
+import os
+import re
+import json
+import shutil
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Longest input sent in a single TTS request (OpenAI's limit is 4096 chars)
+MAX_TTS_CHARS = 3800
+
+# Whitespace following the end of a sentence
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Output directories already created by this process
+_ensured_dirs = set()
+
+def _ensure_dir(path):
+    """Create a directory (and parents) unless this process already has."""
+    if path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
+
+
+class TextToSpeechAgent:
+    """Agent for converting text to speech using OpenAI's TTS API."""
+    
+    def __init__(self, api_key=None):
+        """
+        Initialize the text-to-speech agent.
+        
+        Args:
+            api_key (str, optional): API key for OpenAI. If not provided, it will be loaded from environment.
+        """
+        # Load API key from environment if not provided
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
+            
+        # Default TTS parameters
+        self.model = "gpt-4o-mini-tts"  # Use tts-1 for higher quality or tts-1-hd for highest quality
+        self.voice = "nova"   # Options: alloy, echo, fable, onyx, nova, shimmer
+    
+    def open_async_client(self):
+        """Open an AsyncOpenAI client for the current event loop; use it as an async context manager."""
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=self.api_key)
+    
+    async def stream_audio(self, text: str, voice: str = None, instructions: str = "Speak in a natural and engaging tone.") -> None:
+        """
+        Stream audio directly to speakers using OpenAI's streaming API.
+        
+        Args:
+            text (str): The text to convert to speech
+            voice (str, optional): Voice to use. Defaults to the instance's default voice.
+            instructions (str, optional): Instructions for the speech style.
+        """
+        voice_to_use = voice or self.voice
+        
+        try:
+            # Truncate very long text to avoid API limits
+            max_chars = 4000  # OpenAI's limit is around 4096 chars
+            if len(text) > max_chars:
+                print(f"Text too long ({len(text)} chars), truncating to {max_chars} chars")
+                text = text[:max_chars] + "..."
+            
+            # Local playback pulls in the audio device libraries, so only import it when streaming
+            from openai.helpers import LocalAudioPlayer
+            
+            print(f"Streaming audio with voice: {voice_to_use}")
+            async with self.open_async_client() as client:
+                async with client.audio.speech.with_streaming_response.create(
+                    model=self.model,
+                    voice=voice_to_use,
+                    input=text,
+                    instructions=instructions,
+                    response_format="mp3",  # or "pcm" for raw audio
+                ) as response:
+                    await LocalAudioPlayer().play(response)
+                
+            print("Audio streaming completed")
+            return True
+            
+        except Exception as e:
+            print(f"Error streaming audio: {str(e)}")
+            return False
+    
+    def _split_text(self, text: str, max_chars: int = MAX_TTS_CHARS) -> List[str]:
+        """
+        Split text into segments of at most max_chars, breaking at sentence boundaries.
+        
+        Args:
+            text (str): The text to split
+            max_chars (int): Maximum number of characters per segment
+            
+        Returns:
+            list: Text segments in reading order
+        """
+        segments = []
+        current = ""
+        
+        for sentence in _SENTENCE_RE.split(text.strip()):
+            # Greedily pack sentences into the current segment
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                segments.append(current)
+                current = ""
+            
+            # A single sentence longer than the limit has to be cut
+            while len(sentence) > max_chars:
+                segments.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            
+            current = f"{current} {sentence}" if current else sentence
+        
+        if current:
+            segments.append(current)
+        
+        return segments
+    
+    async def _stream_segment(self, client, segment: str, voice: str, output_path: str) -> None:
+        """
+        Stream the audio for one text segment straight to disk as it arrives.
+        
+        Args:
+            client (AsyncOpenAI): Client to issue the request with
+            segment (str): The text to convert to speech
+            voice (str): Voice to use
+            output_path (str): Path to write the MP3 data to
+        """
+        async with client.audio.speech.with_streaming_response.create(
+            model=self.model,
+            voice=voice,
+            input=segment,
+            response_format="mp3"
+        ) as response:
+            with open(output_path, "wb") as f:
+                async for chunk in response.iter_bytes(64 * 1024):
+                    f.write(chunk)
+    
+    async def agenerate_speech(self, text: str, output_path: str, voice: str = None, client=None) -> Optional[str]:
+        """
+        Generate an audio file for text of any length, synthesizing its segments concurrently.
+        
+        Args:
+            text (str): The text to convert to speech
+            output_path (str): Path to save the audio file
+            voice (str, optional): Voice to use. Defaults to the instance's default voice.
+            client (AsyncOpenAI, optional): Client shared with other requests on this event loop.
+                A client is opened for this call if not provided.
+            
+        Returns:
+            str: Path to the generated audio file, or None if there is no text to speak
+        """
+        segments = self._split_text(text)
+        if not segments:
+            print("No text to convert to speech")
+            return None
+        
+        if client is None:
+            async with self.open_async_client() as client:
+                return await self.agenerate_speech(text, output_path, voice, client)
+        
+        voice_to_use = voice or self.voice
+        print(f"Generating audio with voice: {voice_to_use} ({len(segments)} segments)")
+        
+        # Ensure directory exists
+        _ensure_dir(os.path.dirname(os.path.abspath(output_path)))
+        
+        # Each segment streams into its own part file; output_path is only replaced once every
+        # segment has arrived, so a failed request never leaves a truncated MP3 behind
+        part_paths = [f"{output_path}.part{i}" for i in range(len(segments))]
+        tmp_path = f"{output_path}.tmp"
+        
+        try:
+            await asyncio.gather(*(
+                self._stream_segment(client, segment, voice_to_use, part_path)
+                for segment, part_path in zip(segments, part_paths)
+            ))
+            
+            if len(part_paths) == 1:
+                os.replace(part_paths[0], output_path)
+            else:
+                # MP3 frames can be concatenated, so the parts are copied back to back
+                with open(tmp_path, "wb") as out:
+                    for part_path in part_paths:
+                        with open(part_path, "rb") as part:
+                            shutil.copyfileobj(part, out)
+                os.replace(tmp_path, output_path)
+        finally:
+            for leftover in part_paths + [tmp_path]:
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        print(f"Audio saved to: {output_path}")
+        
+        return output_path
+    
+    def generate_speech(self, text: str, output_path: str = None, voice: str = None) -> Optional[str]:
+        """
+        Generate audio file from text using OpenAI's TTS API.
+        
+        Args:
+            text (str): The text to convert to speech
+            output_path (str, optional): Path to save the audio file. Defaults to 'speech.mp3'.
+            voice (str, optional): Voice to use. Defaults to the instance's default voice.
+            
+        Returns:
+            str: Path to the generated audio file or None on failure
+        """
+        if output_path is None:
+            output_path = "speech.mp3"
+            
+        try:
+            return asyncio.run(self.agenerate_speech(text, output_path, voice))
+        except Exception as e:
+            print(f"Error generating speech: {str(e)}")
+            return None
+    
+    def generate_episode_audio(self, episode_content: str, episode_number: int, output_dir: str) -> Optional[str]:
+        """
+        Generate audio for a specific episode and save it to the specified directory.
+        
+        Args:
+            episode_content (str): The text content of the episode
+            episode_number (int): The episode number
+            output_dir (str): Directory to save the audio files
+            
+        Returns:
+            str: Path to the generated audio file
+        """
+        # Create output path for this episode (generate_speech creates the audio directory)
+        audio_dir = os.path.join(output_dir, "audio")
+        output_path = os.path.join(audio_dir, f"episode_{episode_number}.mp3")
+        
+        # Generate audio for the whole episode
+        return self.generate_speech(episode_content, output_path)
+    
+    async def _agenerate_one(self, client, episode_content: str, episode_number: int, output_dir: str, semaphore: asyncio.Semaphore) -> Optional[str]:
+        """
+        Generate audio for one episode once a concurrency slot is free.
+        
+        Args:
+            client (AsyncOpenAI): Client shared by all episodes of the run
+            episode_content (str): The text content of the episode
+            episode_number (int): The episode number
+            output_dir (str): Directory to save the audio files
+            semaphore (asyncio.Semaphore): Limits the number of episodes generated at once
+            
+        Returns:
+            str: Path to the generated audio file or None on failure
+        """
+        output_path = os.path.join(output_dir, "audio", f"episode_{episode_number}.mp3")
+        async with semaphore:
+            try:
+                return await self.agenerate_speech(episode_content, output_path, client=client)
+            except Exception as e:
+                print(f"Error generating audio for episode {episode_number}: {str(e)}")
+                return None
+    
+    async def generate_all_episode_audio(self, episodes: Dict[int, str], output_dir: str, max_concurrency: int = 8) -> Dict[int, Optional[str]]:
+        """
+        Generate audio for every episode of a story concurrently.
+        
+        Args:
+            episodes (dict): Episode text content keyed by episode number
+            output_dir (str): Directory to save the audio files
+            max_concurrency (int): Maximum number of episodes generated at once
+            
+        Returns:
+            dict: Path to each episode's audio file (None on failure), keyed by episode number
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        # One client, and so one connection pool, for every episode of the run
+        async with self.open_async_client() as client:
+            paths = await asyncio.gather(*(
+                self._agenerate_one(client, content, number, output_dir, semaphore)
+                for number, content in episodes.items()
+            ))
+        return dict(zip(episodes.keys(), paths))
+    
+    async def play_episode_audio(self, episode_content: str, voice: str = None) -> bool:
+        """
+        Play episode audio directly using streaming API.
+        
+        Args:
+            episode_content (str): The text content of the episode
+            voice (str, optional): Voice to use. Defaults to the instance's default voice.
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return await self.stream_audio(episode_content, voice)
+
+
+# Example usage
+if __name__ == "__main__":
+    # Test the streaming functionality
+    async def test_streaming():
+        agent = TextToSpeechAgent()
+        text = "Today is a wonderful day to build something people love!"
+        await agent.stream_audio(text, voice="nova")
+    
+    # Test the file generation functionality
+    def test_file_generation():
+        agent = TextToSpeechAgent()
+        text = "Today is a wonderful day to build something people love!"
+        audio_path = agent.generate_speech(text)
+        if audio_path:
+            print(f"Audio generated successfully at: {audio_path}")
+        else:
+            print("Failed to generate audio")
+    
+    # Run the async test
+    asyncio.run(test_streaming())
+    
+    # Run the sync test
+    test_file_generation()
+
+
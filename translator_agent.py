@@ -1,19 +1,70 @@
 from dotenv import load_dotenv
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from llm_api import llm_api
-from pydantic import BaseModel, Field
-import concurrent.futures
+from langchain_core.runnables import RunnableLambda
+from llm_api import llm_api, get_model_from_config
+from text_to_speech_agent import _ensure_dir
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
 import re
+import shutil
+import sqlite3
+import textwrap
+import threading
 
 load_dotenv()
 
-class TranslationResult(BaseModel):
-    """Result of translating text to another language."""
+logger = logging.getLogger(__name__)
+
+# Chunk progress is logged once every this many completed chunks
+PROGRESS_LOG_EVERY = 10
+
+# Maximum number of chunk translations in flight at once
+TRANSLATION_CONCURRENCY = int(os.getenv("KUKUFM_TRANSLATION_CONCURRENCY", "32"))
+
+# SQLite file caching translated chunks across runs (set to an empty string to disable)
+TRANSLATION_CACHE_PATH = os.getenv("KUKUFM_TRANSLATION_CACHE", ".translator_cache.db")
+
+# Paragraph breaks used to split stories into chunks
+_PARA_RE = re.compile(r'\n\n+')
+
+# Translation system prompt - kept static and sent first so every chunk request shares
+# a byte-identical prefix the provider can serve from its prompt cache
+SYSTEM_PROMPT = textwrap.dedent("""\
+    You are an expert translator.
+    Your task is to translate text to the requested target language.
+    Maintain the original paragraph structure, formatting, and preserve any titles or headings.
+    Ensure the translation sounds natural in the target language while preserving the original meaning.
+    The expressions and idioms should be culturally appropriate for the target audience. Moreover the language must conform to the literature style of the target language.
+    Return only the translated text, without any commentary or preamble.""")
+
+# Cached translations are only valid for this exact prompt
+SYSTEM_PROMPT_HASH = hashlib.blake2b(SYSTEM_PROMPT.encode("utf-8"), digest_size=16).hexdigest()
+
+TRANSLATION_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        ("human", "Translate the following text to {target_language}:\n\n{text}"),
+    ]
+)
+
+# LLM clients shared across agent instances, keyed by (model type, API key fingerprint)
+_llms = {}
+_llms_lock = threading.Lock()
+
+def _get_llm(model_type, api_key):
+    """Return the LLM client for these settings, building it on first use."""
+    # Only a fingerprint of the API key is kept in the cache key
+    api_key_fp = hashlib.blake2b((api_key or "").encode("utf-8"), digest_size=8).hexdigest()
+    key = (model_type, api_key_fp)
     
-    translated_text: str = Field(
-        ...,
-        description="The translated text in the target language.",
-    )
+    with _llms_lock:
+        if key not in _llms:
+            _llms[key] = llm_api(api_key=api_key, model_type=model_type)
+        return _llms[key]
 
 class TranslatorAgent:
     """Agent for translating story content into different languages."""
@@ -26,29 +77,50 @@ class TranslatorAgent:
             api_key (str, optional): API key for the LLM service
             model_type (str, optional): Type of model to use for translation
         """
-        # Initialize LLM using the same llm_api as in outline_generation_agent
-        self.llm = llm_api(api_key=api_key, model_type=model_type)
+        self.model_name = get_model_from_config(model_type)
+        self.system_prompt = SYSTEM_PROMPT
+        self.prompt_hash = SYSTEM_PROMPT_HASH
         
-        # Create structured output parser
-        self.structured_llm_translation = self.llm.with_structured_output(TranslationResult)
+        # Reuse the LLM client built by any earlier agent with the same settings
+        self.llm = _get_llm(model_type, api_key)
         
-        # Create translation prompt
-        self.system_prompt = """You are an expert translator.
-        Your task is to translate text to the requested target language.
-        Maintain the original paragraph structure, formatting, and preserve any titles or headings.
-        Ensure the translation sounds natural in the target language while preserving the original meaning.
-        The expressions and idioms should be culturally appropriate for the target audience. Moreover the language must conform to the literature style of the target language.
-        Return only the translated text in the 'translated_text' field."""
+        # Translator chains with the target language already bound, one per language
+        self._language_chains = {}
         
-        self.translation_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", self.system_prompt),
-                ("human", "Translate the following text to {target_language}:\n\n{text}"),
-            ]
-        )
-        
-        # Create translator chain
-        self.translator = self.translation_prompt | self.structured_llm_translation
+        if TRANSLATION_CACHE_PATH:
+            with sqlite3.connect(TRANSLATION_CACHE_PATH) as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+    
+    def _translator_for(self, target_language):
+        """Return the translator chain with target_language pre-bound, so chunk inputs only carry the text."""
+        chain = self._language_chains.get(target_language)
+        if chain is None:
+            # Plain text output - no tool-calling schema or JSON parsing for a single string
+            chain = TRANSLATION_PROMPT.partial(target_language=target_language) | self.llm | StrOutputParser()
+            self._language_chains[target_language] = chain
+        return chain
+    
+    def _cache_key(self, chunk, target_language):
+        """Key a chunk translation on the language, model, system prompt and chunk text."""
+        return hashlib.blake2b(
+            f"{target_language}|{self.model_name}|{self.prompt_hash}|{chunk}".encode("utf-8")
+        ).hexdigest()
+    
+    def _cache_lookup(self, keys):
+        """Return the cached translations for the given keys as a {key: text} dict."""
+        if not TRANSLATION_CACHE_PATH or not keys:
+            return {}
+        with sqlite3.connect(TRANSLATION_CACHE_PATH) as conn:
+            placeholders = ",".join("?" * len(keys))
+            rows = conn.execute(f"SELECT key, text FROM translations WHERE key IN ({placeholders})", list(keys))
+            return dict(rows)
+    
+    def _cache_store(self, entries):
+        """Store (key, text) translation pairs in the cache."""
+        if not TRANSLATION_CACHE_PATH or not entries:
+            return
+        with sqlite3.connect(TRANSLATION_CACHE_PATH) as conn:
+            conn.executemany("INSERT OR REPLACE INTO translations (key, text) VALUES (?, ?)", entries)
     
     def _split_into_chunks(self, text, max_chunk_size=3000):
         """
@@ -62,15 +134,15 @@ class TranslatorAgent:
             list: List of text chunks
         """
         # Split by paragraph breaks
-        paragraphs = re.split(r'\n\n+', text)
+        paragraphs = _PARA_RE.split(text)
         
         chunks = []
         current_chunk = []
         current_word_count = 0
         
         for paragraph in paragraphs:
-            # Count words in paragraph
-            paragraph_word_count = len(paragraph.split())
+            # Approximate the word count without building a word list (good enough for chunking)
+            paragraph_word_count = paragraph.count(' ') + 1
             
             # Check if adding this paragraph would exceed the chunk size
             if current_word_count + paragraph_word_count > max_chunk_size and current_chunk:
@@ -89,75 +161,246 @@ class TranslatorAgent:
         
         return chunks
     
-    def _translate_chunk(self, chunk, target_language):
+    def _chunk_inputs(self, story_text, target_language):
         """
-        Translate a single chunk of text.
+        Split a story into chunks and build the translator inputs for each.
         
         Args:
-            chunk (str): Text chunk to translate
+            story_text (str): Full story text to translate
             target_language (str): Target language for translation
             
         Returns:
-            str: Translated text chunk
+            list: One translator input dict per chunk
         """
-        try:
-            result = self.translator.invoke({
-                "target_language": target_language,
-                "text": chunk
-            })
-            return result.translated_text
-        except Exception as e:
-            print(f"Error translating chunk: {str(e)}")
-            return f"[Translation error: {str(e)}]"
+        print(f"---TRANSLATING STORY TO {target_language.upper()}---")
+        
+        # Split the story into chunks
+        chunks = self._split_into_chunks(story_text)
+        print(f"Split story into {len(chunks)} chunks")
+        
+        return [{"text": chunk} for chunk in chunks]
+    
+    def _split_cached(self, inputs, target_language):
+        """
+        Look up each chunk in the response cache.
+        
+        Args:
+            inputs (list): Translator input dicts, one per chunk
+            target_language (str): Target language for translation
+            
+        Returns:
+            tuple: (cache keys, cached {key: text} dict, inputs that still need translating)
+        """
+        keys = [self._cache_key(item["text"], target_language) for item in inputs]
+        cached = self._cache_lookup(keys)
+        if cached:
+            print(f"Reusing {sum(key in cached for key in keys)} cached chunks")
+        missing = [item for item, key in zip(inputs, keys) if key not in cached]
+        return keys, cached, missing
+    
+    def _join_results(self, keys, cached, results):
+        """
+        Merge fresh batch results with cached chunks, in chunk order, into the translated story.
+        
+        Args:
+            keys (list): Cache key of every chunk
+            cached (dict): Cached translations by key
+            results (list): Translated texts or exceptions for the uncached chunks, in order
+            
+        Returns:
+            str: Translated story
+        """
+        fresh = iter(results)
+        translated_chunks = []
+        new_entries = []
+        for index, key in enumerate(keys):
+            if key in cached:
+                translated_chunks.append(cached[key])
+                continue
+            
+            result = next(fresh)
+            if isinstance(result, Exception):
+                logger.warning("Error translating chunk %d: %s", index, result)
+                translated_chunks.append(f"[Translation error in chunk {index+1}: {str(result)}]")
+            else:
+                translated_chunks.append(result)
+                new_entries.append((key, result))
+        
+        self._cache_store(new_entries)
+        translated_text = "\n\n".join(translated_chunks)
+        
+        print(f"Translation completed.")
+        return translated_text
+    
+    async def atranslate_story(self, story_text: str, target_language: str) -> str:
+        """
+        Translate a complete story to the target language without blocking the event loop.
         
-    def translate_story(self, story_text: str, target_language: str) -> str:
+        Args:
+            story_text (str): Full story text to translate
+            target_language (str): Target language (e.g., "Hindi", "Spanish", "French")
+            
+        Returns:
+            str: Translated story
+        """
+        keys, cached, missing = self._split_cached(self._chunk_inputs(story_text, target_language), target_language)
+        results = await self._translator_for(target_language).abatch(
+            missing,
+            config={"max_concurrency": TRANSLATION_CONCURRENCY},
+            return_exceptions=True
+        ) if missing else []
+        return self._join_results(keys, cached, results)
+    
+    def translate_story(self, story_text: str, target_language: str, request_semaphore=None) -> str:
         """
         Translate a complete story to the target language.
         
         Args:
             story_text (str): Full story text to translate
             target_language (str): Target language (e.g., "Hindi", "Spanish", "French")
+            request_semaphore (threading.Semaphore, optional): Held around each chunk request,
+                so callers can cap LLM requests shared with other work
             
         Returns:
             str: Translated story
         """
-        print(f"---TRANSLATING STORY TO {target_language.upper()}---")
+        keys, cached, missing = self._split_cached(self._chunk_inputs(story_text, target_language), target_language)
+        translator = self._translator_for(target_language)
+        if request_semaphore is not None:
+            translator = RunnableLambda(
+                lambda item, chain=translator: self._invoke_holding(chain, item, request_semaphore)
+            )
+        results = translator.batch(
+            missing,
+            config={"max_concurrency": TRANSLATION_CONCURRENCY},
+            return_exceptions=True
+        ) if missing else []
+        return self._join_results(keys, cached, results)
+    
+    @staticmethod
+    def _invoke_holding(chain, item, semaphore):
+        # Only the request itself holds the slot, chunks still run side by side
+        with semaphore:
+            return chain.invoke(item)
+    
+    async def _atranslate_chunk(self, chunk, target_language, semaphore):
+        """
+        Translate a single chunk of text without blocking the event loop.
         
-        # Split the story into chunks
-        chunks = self._split_into_chunks(story_text)
-        print(f"Split story into {len(chunks)} chunks")
+        Args:
+            chunk (str): Text chunk to translate
+            target_language (str): Target language for translation
+            semaphore (asyncio.Semaphore): Limits the number of concurrent translation requests
+            
+        Returns:
+            str: Translated text chunk, or None on failure
+        """
+        # The sqlite cache is read and written off the event loop, and a cache failure
+        # only costs a cache hit, never the chunk itself
+        key = self._cache_key(chunk, target_language)
+        try:
+            cached = await asyncio.to_thread(self._cache_lookup, [key])
+        except Exception as e:
+            logger.warning("Error reading translation cache: %s", e)
+            cached = {}
+        if key in cached:
+            return cached[key]
         
-        translated_chunks = []
+        async with semaphore:
+            try:
+                result = await self._translator_for(target_language).ainvoke({"text": chunk})
+            except Exception as e:
+                logger.warning("Error translating chunk: %s", e)
+                return None
+        
+        try:
+            await asyncio.to_thread(self._cache_store, [(key, result)])
+        except Exception as e:
+            logger.warning("Error writing translation cache: %s", e)
+        return result
+    
+    async def translate_and_speak(self, story_text: str, target_language: str, tts_agent, output_path: str, max_speech_concurrency: int = 8) -> tuple:
+        """
+        Translate a story and narrate it, starting the speech for each chunk as soon as its translation is ready.
         
-        # Translate chunks in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=12) as executor:
-            # Create a dictionary to track future objects and their corresponding chunk index
-            future_to_index = {
-                executor.submit(self._translate_chunk, chunk, target_language): i 
-                for i, chunk in enumerate(chunks)
-            }
+        Args:
+            story_text (str): Full story text to translate
+            target_language (str): Target language (e.g., "Hindi", "Spanish", "French")
+            tts_agent (TextToSpeechAgent): Agent used to synthesize the translated chunks
+            output_path (str): Path to save the narrated MP3 file
+            max_speech_concurrency (int): Maximum number of chunks being narrated at once
             
-            # Process translation results as they complete
-            for future in concurrent.futures.as_completed(future_to_index):
-                index = future_to_index[future]
+        Returns:
+            tuple: Translated story, and the 1-based numbers of the chunks missing from the audio
+        """
+        inputs = self._chunk_inputs(story_text, target_language)
+        semaphore = asyncio.Semaphore(TRANSLATION_CONCURRENCY)
+        speech_semaphore = asyncio.Semaphore(max_speech_concurrency)
+        part_paths = [f"{output_path}.chunk{i}" for i in range(len(inputs))]
+        completed = itertools.count(1)
+        
+        # Translate one chunk, then speak it into its own part file without waiting for the others.
+        # Never raises, so one failed chunk can't abort the others while they still write parts.
+        async def translate_then_speak(client, index, item, part_path):
+            translated = await self._atranslate_chunk(item["text"], target_language, semaphore)
+            if translated is not None:
+                async with speech_semaphore:
+                    try:
+                        await tts_agent.agenerate_speech(translated, part_path, client=client)
+                    except Exception as e:
+                        logger.warning("Error narrating chunk %d: %s", index, e)
+            
+            # Throttled progress - one log line per PROGRESS_LOG_EVERY chunks instead of one per chunk
+            done = next(completed)
+            if done % PROGRESS_LOG_EVERY == 0 or done == len(inputs):
+                logger.info("Completed %d/%d chunks", done, len(inputs))
+            return translated
+        
+        try:
+            # One client, and so one connection pool, for every chunk's narration
+            async with tts_agent.open_async_client() as client:
+                results = await asyncio.gather(*(
+                    translate_then_speak(client, index, item, part_path)
+                    for index, (item, part_path) in enumerate(zip(inputs, part_paths))
+                ))
+            
+            translated_chunks = [
+                result if result is not None else f"[Translation error in chunk {index+1}]"
+                for index, result in enumerate(results)
+            ]
+            missing_audio = [index + 1 for index, part_path in enumerate(part_paths) if not os.path.exists(part_path)]
+            
+            # Stitch the narrated chunks together in story order, replacing the output only once complete
+            if len(missing_audio) < len(part_paths):
+                tmp_path = f"{output_path}.tmp"
                 try:
-                    translated_chunk = future.result()
-                    print(f"Completed chunk {index+1}/{len(chunks)}")
-                    # Store the result with its index for proper ordering
-                    translated_chunks.append((index, translated_chunk))
-                except Exception as e:
-                    print(f"Error translating chunk {index}: {str(e)}")
-                    translated_chunks.append((index, f"[Translation error in chunk {index+1}: {str(e)}]"))
-        
-        # Sort the chunks by original index and join them
-        translated_chunks.sort(key=lambda x: x[0])
-        translated_text = "\n\n".join(chunk for _, chunk in translated_chunks)
+                    _ensure_dir(os.path.dirname(os.path.abspath(output_path)))
+                    with open(tmp_path, "wb") as out:
+                        for part_path in part_paths:
+                            if os.path.exists(part_path):
+                                with open(part_path, "rb") as part:
+                                    shutil.copyfileobj(part, out)
+                    os.replace(tmp_path, output_path)
+                except OSError as e:
+                    logger.warning("Error saving narration to %s: %s", output_path, e)
+                    missing_audio = list(range(1, len(part_paths) + 1))
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+        finally:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
         
+        if missing_audio:
+            logger.warning("Narration is missing chunks %s", missing_audio)
+        else:
+            print(f"Narrated translation saved to: {output_path}")
         print(f"Translation completed.")
-        return translated_text
-
+        return "\n\n".join(translated_chunks), missing_audio
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Example usage
     translator = TranslatorAgent()
     